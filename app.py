@@ -4,14 +4,19 @@ POC Streamlit App to test netpull (Playwright) compatibility with Streamlit
 import streamlit as st
 import asyncio
 import sys
-import subprocess
 import os
+import re
+import importlib.util
 from pathlib import Path
 import json
 import urllib.parse
 import threading
+import queue
+import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache, partial
 
 # Set event loop policy for Windows to avoid "NotImplementedError" with Playwright
 if sys.platform == 'win32':
@@ -19,28 +24,52 @@ if sys.platform == 'win32':
 
 print("🚀 Starting Streamlit App...")
 
-import base64
+# orjson is optional; fall back to the stdlib encoder when it is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_json(data) -> str:
+    """Serialize data as indented JSON text, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2, default=str).decode()
+    return json.dumps(data, indent=2, default=str, ensure_ascii=False)  # Match orjson: UTF-8, not \u escapes
+
 
 def trigger_download(file_path: Path, file_name: str):
-    """Generates a link to download the given file and auto-clicks it."""
+    """Renders a download button for the given file and auto-clicks it."""
     try:
         if not file_path.exists():
             st.warning(f"File not found for download: {file_name}")
             return
-        
-        with open(file_path, "rb") as f:
-            data = f.read()
-            b64 = base64.b64encode(data).decode()
-            
+
+        # Streamlit serves the bytes from its media endpoint; no base64 data URI.
+        # ASCII-only key: Streamlit replaces anything else in the st-key-* class
+        key = "auto_dl_" + re.sub(r"[^a-zA-Z0-9_-]", "_", file_name)
+        st.download_button(
+            label=f"Download {file_name}",
+            data=file_path.read_bytes(),
+            file_name=file_name,
+            key=key,
+            on_click="ignore"
+        )
+
         md = f"""
-            <a href="data:file/octet-stream;base64,{b64}" download="{file_name}" id="download_link_{file_name}">Download {file_name}</a>
             <script>
                 (function() {{
-                    var link = document.getElementById("download_link_{file_name}");
-                    if (link) {{
-                        link.click();
-                        console.log("Auto-clicked download for {file_name}");
-                    }}
+                    var attempts = 0;
+                    var timer = setInterval(function() {{
+                        var button = window.parent.document.querySelector(".st-key-{key} button");
+                        if (button || ++attempts > 20) {{
+                            clearInterval(timer);
+                        }}
+                        if (button) {{
+                            button.click();
+                            console.log("Auto-clicked download for {file_name}");
+                        }}
+                    }}, 100);
                 }})();
             </script>
         """
@@ -49,10 +78,92 @@ def trigger_download(file_path: Path, file_name: str):
         print(f"Error triggering download for {file_name}: {e}")
 
 
+# Entries shown per list before the rest is left to the JSON download
+JSON_PREVIEW_ITEMS = 20
+
+
+def _truncate_lists(data):
+    """
+    Copy of data with every list, at any depth, cut to JSON_PREVIEW_ITEMS.
+
+    Returns:
+        (truncated copy, length of the longest list found)
+    """
+    if isinstance(data, list):
+        items = [_truncate_lists(v) for v in data[:JSON_PREVIEW_ITEMS]]
+        longest = max((n for _, n in items), default=0)
+        return [v for v, _ in items], max(len(data), longest)
+    if isinstance(data, dict):
+        items = {k: _truncate_lists(v) for k, v in data.items()}
+        longest = max((n for _, n in items.values()), default=0)
+        return {k: v for k, (v, _) in items.items()}, longest
+    return data, 0
+
+
+def show_json_preview(data, file_name: str):
+    """
+    Render a list or dict with its lists truncated to JSON_PREVIEW_ITEMS entries.
+
+    The full payload is offered as a download, which is only serialized and
+    fetched when clicked, instead of on every render.
+    """
+    preview, total = _truncate_lists(data)
+    if isinstance(data, list):
+        caption = f"Showing first {JSON_PREVIEW_ITEMS} of {len(data)} items"
+    else:
+        caption = f"Showing first {JSON_PREVIEW_ITEMS} entries of each list"
+
+    if total <= JSON_PREVIEW_ITEMS:
+        st.json(data)
+        return
+
+    st.caption(caption)
+    st.json(preview)
+    st.download_button(
+        label="Download full JSON",
+        data=partial(dumps_json, data),  # Serialized only when clicked
+        file_name=file_name,
+        mime="application/json",
+        key=f"json_{file_name}",
+        on_click="ignore"
+    )
+
+
+# File readers for the result tabs. mtime_ns is part of the cache key so a file
+# rewritten by a new extraction is read again; otherwise reruns skip the disk.
+@st.cache_data(max_entries=32, ttl=600, show_spinner=False)
+def read_file_bytes(path: str, mtime_ns: int) -> bytes:
+    """Return the contents of path (cached per path and mtime)."""
+    return Path(path).read_bytes()
+
+
+@st.cache_data(max_entries=32, ttl=600, show_spinner=False)
+def read_text_preview(path: str, mtime_ns: int, limit: int) -> tuple:
+    """
+    Read the first limit characters of a UTF-8 text file.
+
+    Returns:
+        (preview, truncated) - truncated is True if the file has more text
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        preview = f.read(limit)
+        truncated = bool(f.read(1))
+    return preview, truncated
+
+
 # =============================================================================
 # QR-Greeting Integration
 # =============================================================================
 
+QR_GREETING_BASE_URL = "https://qr-greeting.streamlit.app/"
+
+# Constant query parameters, encoded once at import
+# tab/from/to are constant, so their urlencoded form is baked in
+_QR_CREATE_PREFIX = QR_GREETING_BASE_URL + "?tab=create&from=Shared+via+NetPull&to=Friend"
+_FUNNEL_PREFIX = QR_GREETING_BASE_URL + "?tab=funnel"
+
+
+@lru_cache(maxsize=256)
 def build_qr_greeting_url(
     source_url: str,
     title: str = "",
@@ -71,32 +182,30 @@ def build_qr_greeting_url(
     Returns:
         Full URL to qr-greeting.streamlit.app with query parameters
     """
-    message_parts = []
-
-    if title:
-        message_parts.append(f"📰 {title}")
-        message_parts.append("")
-
-    if summary:
-        truncated = summary[:300] + "..." if len(summary) > 300 else summary
-        message_parts.append(truncated)
-        message_parts.append("")
-
-    message_parts.append(f"🔗 {source_url}")
-
-    params = {
-        "tab": "create",
-        "from": "Shared via NetPull",
-        "to": "Friend",
-        "message": "\n".join(message_parts),
-        "url": source_url,
-        "theme": theme
-    }
-
-    base_url = "https://qr-greeting.streamlit.app/"
-    return f"{base_url}?{urllib.parse.urlencode(params)}"
+    if len(summary) > 300:
+        summary = summary[:300] + "..."
+    message = "\n\n".join(part for part in (
+        f"📰 {title}" if title else "",
+        summary,
+        f"🔗 {source_url}"
+    ) if part)
+    quote = urllib.parse.quote_plus
+    return f"{_QR_CREATE_PREFIX}&message={quote(message)}&url={quote(source_url)}&theme={quote(theme)}"
+
+
+# Theme keywords in priority order; each alternative is a lookahead over the
+# whole URL so the first matching theme wins, as in the original if/elif chain
+_THEME_RE = re.compile(
+    r"(?=.*?(?P<fireworks>youtube|vimeo|tiktok|video))"
+    r"|(?=.*?(?P<lights>news|bbc|cnn|nytimes))"
+    r"|(?=.*?(?P<confetti>amazon|ebay|shop|etsy))"
+    r"|(?=.*?(?P<stars>github|gitlab|stackoverflow))"
+    r"|(?=.*?(?P<champagne>linkedin|twitter|facebook))",
+    re.IGNORECASE | re.DOTALL
+)
 
 
+@lru_cache(maxsize=256)
 def detect_theme_from_url(url: str) -> str:
     """
     Auto-detect appropriate QR-Greeting theme based on URL domain.
@@ -107,26 +216,15 @@ def detect_theme_from_url(url: str) -> str:
     Returns:
         Theme name string
     """
-    url_lower = url.lower()
-
-    if any(d in url_lower for d in ['youtube', 'vimeo', 'tiktok', 'video']):
-        return "fireworks"
-    elif any(d in url_lower for d in ['news', 'bbc', 'cnn', 'nytimes']):
-        return "lights"
-    elif any(d in url_lower for d in ['amazon', 'ebay', 'shop', 'etsy']):
-        return "confetti"
-    elif any(d in url_lower for d in ['github', 'gitlab', 'stackoverflow']):
-        return "stars"
-    elif any(d in url_lower for d in ['linkedin', 'twitter', 'facebook']):
-        return "champagne"
-    else:
-        return "lights"
+    match = _THEME_RE.match(url)
+    return match.lastgroup if match else "lights"
 
 
 # =============================================================================
 # Marketing Funnel QR Functions
 # =============================================================================
 
+@lru_cache(maxsize=256)
 def build_funnel_url(
     landing_url: str,
     video_url: str = "",
@@ -162,24 +260,33 @@ def build_funnel_url(
     if detected_price:
         offer_text = f"{offer_text}\n\n💰 {detected_price}" if offer_text else f"💰 {detected_price}"
     
-    params = {
-        "tab": "funnel",
-        "landing_url": landing_url,
-        "source": "netpull"  # Track that this came from NetPull
-    }
-    
-    # Only add non-empty values
-    if video_url:
-        params["video_url"] = video_url
-    if headline:
-        params["headline"] = headline
-    if offer_text:
-        params["offer_text"] = offer_text
-    if og_image:
-        params["og_image"] = og_image
-    
-    base_url = "https://qr-greeting.streamlit.app/"
-    return f"{base_url}?{urllib.parse.urlencode(params)}"
+    # Track that this came from NetPull; optional values are only added if non-empty
+    optional = (
+        ("video_url", video_url),
+        ("headline", headline),
+        ("offer_text", offer_text),
+        ("og_image", og_image)
+    )
+    quote = urllib.parse.quote_plus
+    return f"{_FUNNEL_PREFIX}&landing_url={quote(landing_url)}&source=netpull" + "".join(
+        f"&{key}={quote(value)}" for key, value in optional if value
+    )
+
+
+# Meta tags checked in order of preference; the first non-empty value wins
+_VIDEO_META_KEYS = ("og:video", "og:video:url", "og:video:secure_url",
+                    "twitter:player", "twitter:player:stream")
+_PRICE_META_KEYS = ("og:price:amount", "product:price:amount")
+_CURRENCY_META_KEYS = ("og:price:currency", "product:price:currency")
+
+
+def _first_meta(metadata: dict, keys: tuple) -> str:
+    """Return the first non-empty metadata value among keys."""
+    for key in keys:
+        value = metadata.get(key)
+        if value:
+            return value
+    return ""
 
 
 def extract_video_from_page(structured_data: dict, metadata: dict) -> str:
@@ -192,18 +299,9 @@ def extract_video_from_page(structured_data: dict, metadata: dict) -> str:
     3. Schema.org video URL
     4. YouTube/Vimeo embed URLs
     """
-    video_url = ""
-    
-    # Check metadata for various video meta tags
+    # Check metadata for OpenGraph / Twitter video meta tags
     if metadata:
-        # OpenGraph video
-        video_url = metadata.get('og:video', '') or metadata.get('og:video:url', '') or \
-                   metadata.get('og:video:secure_url', '')
-        if video_url:
-            return video_url
-        
-        # Twitter video
-        video_url = metadata.get('twitter:player', '') or metadata.get('twitter:player:stream', '')
+        video_url = _first_meta(metadata, _VIDEO_META_KEYS)
         if video_url:
             return video_url
     
@@ -214,12 +312,11 @@ def extract_video_from_page(structured_data: dict, metadata: dict) -> str:
             for para in structured_data.get('paragraphs', []):
                 if 'youtube.com/watch' in para or 'youtu.be/' in para:
                     # Try to extract the URL
-                    import re
                     youtube_match = re.search(r'(https?://(?:www\.)?(?:youtube\.com/watch\?v=|youtu\.be/)[\w-]+)', para)
                     if youtube_match:
                         return youtube_match.group(1)
     
-    return video_url
+    return ""
 
 
 def extract_price_from_page(structured_data: dict, metadata: dict) -> str:
@@ -231,23 +328,17 @@ def extract_price_from_page(structured_data: dict, metadata: dict) -> str:
     2. Schema.org structured data
     3. Common price patterns in content
     """
-    import re
-    
     # Check metadata for price
     if metadata:
-        price = metadata.get('og:price:amount', '') or \
-               metadata.get('product:price:amount', '') or \
-               metadata.get('twitter:data1', '') if 'price' in metadata.get('twitter:label1', '').lower() else ''
-        currency = metadata.get('og:price:currency', '') or \
-                  metadata.get('product:price:currency', '') or 'USD'
+        price = _first_meta(metadata, _PRICE_META_KEYS)
+        if not price and 'price' in metadata.get('twitter:label1', '').lower():
+            price = metadata.get('twitter:data1', '')
         if price:
-            try:
-                # Clean and format price
-                price_clean = re.sub(r'[^\d.]', '', str(price))
-                if price_clean:
-                    return f"{currency} {price_clean}"
-            except:
-                pass
+            # Clean and format price
+            price_clean = re.sub(r'[^\d.]', '', str(price))
+            if price_clean:
+                currency = _first_meta(metadata, _CURRENCY_META_KEYS) or 'USD'
+                return f"{currency} {price_clean}"
     
     # Check structured data for common price patterns
     if structured_data:
@@ -262,30 +353,88 @@ def extract_price_from_page(structured_data: dict, metadata: dict) -> str:
     return ""
 
 
+def extract_funnel_fields(structured_data: dict, metadata: dict) -> tuple:
+    """
+    Collect everything the funnel builder needs from one extraction.
+
+    Args:
+        structured_data: ExtractionResult.structured_data (or {})
+        metadata: ExtractionResult.metadata (or {})
+
+    Returns:
+        (page_title, page_description, og_image, video_url, price) - empty
+        strings for anything not found
+    """
+    page_title = structured_data.get('title', '') if structured_data else ""
+    if not metadata:
+        return page_title, "", "", "", ""
+
+    page_description = metadata.get('og:description', '') or metadata.get('description', '')
+    return (
+        page_title,
+        page_description,
+        metadata.get('og:image', ''),
+        extract_video_from_page(structured_data, metadata),
+        extract_price_from_page(structured_data, metadata)
+    )
+
+
 # =============================================================================
 # QR-Greeting Keepalive Daemon
 # =============================================================================
 
+KEEPALIVE_THREAD_NAME = "qr-greeting-keepalive"
+
+# Own handler with the same "[timestamp] message" lines the app prints
+# elsewhere; guarded because Streamlit re-executes this module on every rerun
+keepalive_log = logging.getLogger("qr_greeting.keepalive")
+if not keepalive_log.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s"))
+    keepalive_log.addHandler(_handler)
+    keepalive_log.setLevel(logging.INFO)
+    keepalive_log.propagate = False
+
+
 def _keepalive_daemon():
     """
     Daemon thread that pings qr-greeting.streamlit.app every 30 minutes
     to keep the service online (prevents Streamlit Cloud from sleeping).
     """
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
 
     QR_GREETING_URL = "https://qr-greeting.streamlit.app/"
     PING_INTERVAL = 30 * 60  # 30 minutes in seconds
 
+    # One session for the thread's lifetime so the TCP/TLS connection is reused
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=2,
+        max_retries=Retry(total=2, backoff_factor=1)
+    ))
+
+    # Schedule against a fixed monotonic deadline so slow pings and
+    # retries don't push every later ping back
+    next_ping = time.monotonic()
     while True:
         try:
-            response = requests.get(QR_GREETING_URL, timeout=30)
-            print(f"[{datetime.now().isoformat()}] Keepalive ping to qr-greeting: Status {response.status_code}")
+            # HEAD wakes the app without downloading its page; if the server
+            # refuses HEAD, GET with stream=True and close before the body
+            response = session.head(QR_GREETING_URL, timeout=30, allow_redirects=True)
+            if response.status_code in (405, 501):
+                response = session.get(QR_GREETING_URL, timeout=30, stream=True)
+                response.close()
+            keepalive_log.info("Keepalive ping to qr-greeting: Status %s", response.status_code)
         except requests.exceptions.Timeout:
-            print(f"[{datetime.now().isoformat()}] Keepalive ping timeout (service may be waking up)")
+            keepalive_log.info("Keepalive ping timeout (service may be waking up)")
         except Exception as e:
-            print(f"[{datetime.now().isoformat()}] Keepalive ping failed: {e}")
+            keepalive_log.info("Keepalive ping failed: %s", e)
 
-        time.sleep(PING_INTERVAL)
+        next_ping += PING_INTERVAL
+        time.sleep(max(0.0, next_ping - time.monotonic()))
 
 
 @st.cache_resource
@@ -294,12 +443,77 @@ def start_keepalive_daemon():
     Start the keepalive daemon thread (runs once due to cache_resource).
     The daemon pings qr-greeting.streamlit.app every 30 minutes.
     """
-    thread = threading.Thread(target=_keepalive_daemon, daemon=True, name="qr-greeting-keepalive")
+    # cache_resource already serializes concurrent first calls, but its cache
+    # is dropped when app.py changes or is cleared; reuse a thread that is
+    # still running from before instead of starting a second one
+    for thread in threading.enumerate():
+        if thread.name == KEEPALIVE_THREAD_NAME and thread.is_alive():
+            return thread
+
+    thread = threading.Thread(target=_keepalive_daemon, daemon=True, name=KEEPALIVE_THREAD_NAME)
     thread.start()
-    print(f"[{datetime.now().isoformat()}] Keepalive daemon started for qr-greeting.streamlit.app")
+    keepalive_log.info("Keepalive daemon started for qr-greeting.streamlit.app")
     return thread
 
 
+def playwright_cache_dir() -> Path:
+    """Directory Playwright downloads browsers into (honours PLAYWRIGHT_BROWSERS_PATH)."""
+    return Path(os.environ.get("PLAYWRIGHT_BROWSERS_PATH", Path.home() / ".cache" / "ms-playwright"))
+
+
+# Written into the Playwright cache once both browsers installed successfully;
+# holds the Playwright version they were installed for
+INSTALL_SENTINEL = ".netpull_installed"
+
+# browsers.json entries the app needs (headless Chrome runs the headless shell)
+REQUIRED_BROWSERS = ("firefox", "chromium", "chromium-headless-shell")
+
+
+def expected_browser_dirs() -> list:
+    """
+    Cache directory names the installed Playwright needs for REQUIRED_BROWSERS.
+
+    Revisions change with every Playwright release, so they are read from the
+    driver's browsers.json (without importing Playwright).
+
+    Returns:
+        Names such as "firefox-1543" or "chromium_headless_shell-1243";
+        empty if the manifest can't be read
+    """
+    spec = importlib.util.find_spec("playwright")
+    if spec is None or not spec.origin:
+        return []
+    manifest = Path(spec.origin).parent / "driver" / "package" / "browsers.json"
+    try:
+        browsers = json.loads(manifest.read_text(encoding="utf-8"))["browsers"]
+        return [
+            f"{browser['name'].replace('-', '_')}-{browser['revision']}"
+            for browser in browsers if browser["name"] in REQUIRED_BROWSERS
+        ]
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+
+def playwright_browsers_present() -> bool:
+    """Check the on-disk Playwright cache, which survives process restarts."""
+    cache = playwright_cache_dir()
+    version = package_versions()["playwright"]
+    try:
+        if version and (cache / INSTALL_SENTINEL).read_text() == version:
+            return True
+    except OSError:
+        pass
+
+    # Playwright writes INSTALLATION_COMPLETE once a browser is fully
+    # extracted, so a directory left by an interrupted download doesn't count.
+    # Without a manifest nothing is known to be present, and the idempotent
+    # install runs
+    expected = expected_browser_dirs()
+    return bool(expected) and all(
+        (cache / name / "INSTALLATION_COMPLETE").exists() for name in expected
+    )
+
+
 # Install Playwright browsers on first run (needed for Streamlit Cloud)
 @st.cache_resource
 def ensure_playwright_browsers():
@@ -307,51 +521,595 @@ def ensure_playwright_browsers():
     if sys.platform != 'linux':
         return True  # Only needed on Linux (Streamlit Cloud)
 
+    if playwright_browsers_present():
+        print("✅ Playwright browsers already present, skipping install")
+        return True
+
+    import fcntl
+
+    # st.cache_resource is per process; an flock on the browser cache makes
+    # concurrent workers wait for a single installer instead of racing it
+    try:
+        cache = playwright_cache_dir()
+        cache.mkdir(parents=True, exist_ok=True)
+        lock_file = open(cache / ".install.lock", "w")
+    except OSError:
+        return _install_playwright_browsers()
+
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if playwright_browsers_present():
+            print("✅ Playwright browsers installed by another worker")
+            return True
+        return _install_playwright_browsers()
+
+
+def _install_playwright_browsers():
+    """Run `playwright install` for Firefox and Chromium; only Firefox is required."""
     try:
         # Install system dependencies is handled by packages.txt on Streamlit Cloud
-        
-        # Install Firefox and Chromium browsers
-        print("Installing Playwright browsers (firefox, chromium)...")
-        browser_result = subprocess.run(
-            [sys.executable, "-m", "playwright", "install", "firefox", "chromium"],
-            capture_output=True,
-            text=True,
-            timeout=600 # Increased timeout for multiple browsers
-        )
+        from install_browsers import install_playwright_browsers
 
-        if browser_result.returncode == 0:
-            print("✅ Playwright browsers installed successfully")
-            return True
-        else:
-            print(f"⚠️ Browser installation failed: {browser_result.stderr}")
-            # Try installing just firefox as fallback
-            print("Trying fallback: installing only firefox...")
-            fallback_result = subprocess.run(
-                [sys.executable, "-m", "playwright", "install", "firefox"],
-                capture_output=True,
-                text=True,
-                timeout=300
-            ) 
-            if fallback_result.returncode == 0:
-                 print("✅ Playwright Firefox installed successfully (fallback)")
-                 return True
-            
-            print(f"❌ Fallback installation failed: {fallback_result.stderr}")
+        failed = install_playwright_browsers(("firefox", "chromium"), timeout=600)
+
+        if "firefox" in failed:
             return False
 
-    except subprocess.TimeoutExpired:
-        print("❌ Browser installation timed out")
-        return False
+        if failed:
+            # Firefox (the default) is enough to run; only the Chrome option is lost
+            print("⚠️ Continuing with Firefox only")
+            return True
+
+        try:
+            (playwright_cache_dir() / INSTALL_SENTINEL).write_text(package_versions()["playwright"] or "")
+        except OSError:
+            pass  # Sentinel is only an optimisation
+        return True
+
     except Exception as e:
         print(f"❌ Error installing browser: {e}")
         return False
 
-# Check if netpull is installed
-try:
-    from netpull import extract_webpage, ExtractionConfig, BrowserConfig
-    NETPULL_AVAILABLE = True
-except ImportError:
-    NETPULL_AVAILABLE = False
+
+# Check if netpull is installed without importing it (and Playwright) yet;
+# the imports happen on first extraction
+NETPULL_AVAILABLE = importlib.util.find_spec("netpull") is not None
+
+
+@st.cache_data(show_spinner=False)
+def package_versions() -> dict:
+    """
+    Installed netpull/Playwright versions, read from package metadata.
+
+    Shown in the System Information panel; the Playwright version also keys
+    the browser install sentinel.
+
+    Returns:
+        {"netpull": version or None, "playwright": version or None}
+    """
+    from importlib.metadata import version, PackageNotFoundError
+
+    versions = {}
+    for package in ("netpull", "playwright"):
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+# =============================================================================
+# Shared Playwright Browser
+# =============================================================================
+
+# Sidebar browser name -> Playwright launcher attribute
+PLAYWRIGHT_LAUNCHERS = {"firefox": "firefox", "chrome": "chromium", "webkit": "webkit"}
+
+# Optional DevTools endpoint of an externally launched Chromium
+# (e.g. http://localhost:9222); when set, "chrome" connects to it instead of
+# launching, so every Streamlit worker shares one browser process
+CDP_ENDPOINT = os.environ.get("NETPULL_CDP_ENDPOINT")
+
+
+def _shutdown_browser(executor, playwright):
+    """Stop a shared browser's Playwright driver, then its executor thread."""
+    def _stop():
+        try:
+            playwright.stop()  # Closes the browser and ends the Node driver
+        except Exception:
+            pass
+
+    try:
+        executor.submit(_stop).result(timeout=30)
+    except Exception:
+        pass
+    executor.shutdown(wait=False)
+
+
+def _browser_alive(shared) -> bool:
+    """cache_resource validator: relaunch if the cached browser has gone away."""
+    executor, playwright, browser = shared
+    if browser.is_connected():
+        return True
+    # The entry is about to be replaced; don't leave its driver and thread behind
+    _shutdown_browser(executor, playwright)
+    return False
+
+
+# Browsers kept per (browser_type, headless). Each runs one extraction at a
+# time on its own thread, so this many extractions can run concurrently
+BROWSER_POOL_SIZE = max(1, int(os.environ.get("NETPULL_BROWSER_POOL_SIZE", "2")))
+
+
+@st.cache_resource(show_spinner=False)
+def browser_slots(browser_type: str, headless: bool):
+    """
+    Free slot numbers of the browser pool for (browser_type, headless).
+
+    LIFO, so sequential extractions keep reusing the warm slot 0 and a
+    further browser is only launched when extractions actually overlap.
+    """
+    slots = queue.LifoQueue()
+    for slot in reversed(range(BROWSER_POOL_SIZE)):
+        slots.put(slot)
+    return slots
+
+
+@st.cache_resource(validate=_browser_alive, show_spinner=False)
+def get_browser(browser_type: str, headless: bool, slot: int):
+    """
+    Launch one long-lived browser per (browser_type, headless, pool slot),
+    shared by every session of this Streamlit process.
+
+    Playwright's sync API only works on the thread that started it, while
+    Streamlit runs each rerun on a fresh thread, so the Playwright instance
+    lives on a dedicated single-thread executor and all browser work is
+    submitted to it.
+
+    Returns:
+        (executor, playwright, browser) tuple
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"playwright-{browser_type}-{slot}")
+
+    def _launch():
+        from playwright.sync_api import sync_playwright
+        playwright = sync_playwright().start()
+        try:
+            launcher = getattr(playwright, PLAYWRIGHT_LAUNCHERS[browser_type])
+            if CDP_ENDPOINT and browser_type == "chrome":
+                browser = launcher.connect_over_cdp(CDP_ENDPOINT)
+            else:
+                browser = launcher.launch(headless=headless)
+        except Exception:
+            # e.g. the browser isn't installed; don't leave the driver running
+            playwright.stop()
+            raise
+        return playwright, browser
+
+    try:
+        playwright, browser = executor.submit(_launch).result()
+    except Exception:
+        executor.shutdown(wait=False)
+        raise
+    print(f"[{datetime.now().isoformat()}] Launched shared {browser_type} browser #{slot} (headless={headless})")
+    return executor, playwright, browser
+
+
+def _extract_page(browser, url: str, extraction_config, browser_config):
+    """
+    netpull's extract_webpage workflow, run against an already-running browser.
+
+    Mirrors netpull 0.1.0's core.extract_webpage step for step and imports
+    modules netpull doesn't export (extractors, cookie_handler, utils), so
+    requirements.txt pins netpull below 0.2; re-check this against
+    core.extract_webpage before raising that bound.
+
+    Runs on the browser's executor thread. Like extract_webpage, every
+    extraction gets a fresh BrowserContext, closed afterwards, so no cookies,
+    storage, cache or permissions carry over between sessions sharing the
+    browser; only the browser itself is left running.
+    """
+    from bs4 import BeautifulSoup
+    from netpull import ExtractionResult, extractors
+    from netpull.cookie_handler import handle_cookie_consent
+    from netpull.utils import generate_filename
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+    result = ExtractionResult(url=url, success=False)
+
+    try:
+        context = browser.new_context(
+            viewport={
+                'width': browser_config.viewport_width,
+                'height': browser_config.viewport_height
+            },
+            user_agent=browser_config.user_agent
+        )
+        try:
+            page = context.new_page()
+            page.goto(url, timeout=browser_config.timeout)
+
+            if extraction_config.wait_for_networkidle:
+                page.wait_for_load_state('networkidle', timeout=browser_config.timeout)
+
+            if extraction_config.handle_cookie_consent:
+                handle_cookie_consent(page, extraction_config.cookie_consent_timeout)
+
+            if extraction_config.scroll_to_bottom:
+                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                page.wait_for_timeout(extraction_config.wait_for_timeout)
+
+            if extraction_config.wait_for_selector:
+                page.wait_for_selector(extraction_config.wait_for_selector, timeout=browser_config.timeout)
+
+            base_filename = generate_filename(url, extraction_config.filename_pattern)
+
+            if extraction_config.extract_screenshot:
+                screenshot_path = extraction_config.output_dir / f"{base_filename}.png"
+                page.screenshot(path=str(screenshot_path), full_page=True)
+                result.screenshot_path = screenshot_path
+
+            html_content = page.content()
+        finally:
+            context.close()
+
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        result.structured_data = extractors.extract_structured_data(soup)
+        if extraction_config.extract_images:
+            result.images = extractors.extract_images(soup)
+        if extraction_config.extract_tables:
+            result.tables = extractors.extract_tables(soup)
+        if extraction_config.extract_forms:
+            result.forms = extractors.extract_forms(soup)
+        if extraction_config.extract_metadata:
+            result.metadata = extractors.extract_metadata(soup)
+
+        if extraction_config.extract_html:
+            cleaned_soup = extractors.clean_html(
+                soup,
+                remove_scripts=extraction_config.remove_scripts,
+                remove_styles=extraction_config.remove_styles,
+                remove_meta=extraction_config.remove_meta,
+                remove_links=extraction_config.remove_links
+            )
+            html_path = extraction_config.output_dir / f"{base_filename}.html"
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(str(cleaned_soup))
+            result.html_path = html_path
+
+        result.success = True
+
+    except PlaywrightTimeout as e:
+        result.error = f"Navigation timeout: {e}"
+    except Exception as e:
+        result.error = f"Extraction failed: {e}"
+
+    return result
+
+
+def extract_with_shared_browser(url: str, extraction_config, browser_config):
+    """
+    Drop-in replacement for netpull's extract_webpage that reuses a
+    cached browser from get_browser() instead of launching a new one.
+
+    A free slot of the browser pool is taken for the extraction and given
+    back once its browser is done, so extractions from different sessions
+    run in parallel up to BROWSER_POOL_SIZE.
+
+    Renders nothing: it runs inside extract_cached(), and st.cache_data
+    would record and replay every element drawn here on each cache hit.
+    The caller's spinner shows the elapsed time instead.
+    """
+    from netpull import ExtractionResult
+
+    extraction_config.validate()
+    browser_config.validate()
+
+    slots = browser_slots(browser_config.browser_type, browser_config.headless)
+    slot = slots.get()  # Waits while every browser in the pool is busy
+
+    try:
+        executor, _, browser = get_browser(browser_config.browser_type, browser_config.headless, slot)
+        future = executor.submit(_extract_page, browser, url, extraction_config, browser_config)
+    except Exception as e:
+        slots.put(slot)
+        # Reported like extract_webpage does, instead of as a traceback
+        return ExtractionResult(url=url, success=False, error=f"Extraction failed: {e}")
+    # Freed when the browser finishes, even if this script run is stopped
+    future.add_done_callback(lambda _: slots.put(slot))
+
+    return future.result()
+
+
+# Where extraction files (screenshots, HTML) are written
+OUTPUT_DIR = Path("./poc_output")
+
+
+@st.cache_data(ttl=60 * 60, show_spinner=False)
+def extract_cached(url: str, browser_type: str, headless: bool, timeout_ms: int, flags: tuple) -> dict:
+    """
+    Extract a page once per (URL, configuration) and reuse the result.
+
+    Args:
+        url: URL to extract
+        browser_type: firefox, chrome or webkit
+        headless: Run the browser headless
+        timeout_ms: Navigation timeout in milliseconds
+        flags: (screenshot, html, images, tables, forms, metadata) toggles
+
+    Returns:
+        result.to_dict(), rebuilt with result_from_dict()
+    """
+    from netpull import BrowserConfig, ExtractionConfig
+
+    screenshot, html, images, tables, forms, metadata = flags
+
+    # Only reached on a cache miss; also recreates the directory if removed
+    OUTPUT_DIR.mkdir(exist_ok=True)
+
+    browser_config = BrowserConfig(
+        browser_type=browser_type,
+        headless=headless,
+        timeout=timeout_ms
+    )
+    extraction_config = ExtractionConfig(
+        output_dir=OUTPUT_DIR,
+        extract_screenshot=screenshot,
+        extract_html=html,
+        extract_images=images,
+        extract_tables=tables,
+        extract_forms=forms,
+        extract_metadata=metadata
+    )
+
+    return extract_with_shared_browser(url, extraction_config, browser_config).to_dict()
+
+
+def result_from_dict(data: dict):
+    """Rebuild an ExtractionResult from extract_cached()'s dict."""
+    from netpull import ExtractionResult
+
+    result = ExtractionResult(**data)
+    if result.screenshot_path:
+        result.screenshot_path = Path(result.screenshot_path)
+    if result.html_path:
+        result.html_path = Path(result.html_path)
+    return result
+
+
+# =============================================================================
+# Result Sections
+# =============================================================================
+
+def render_screenshot_tab(screenshot_path: Path):
+    """Screenshot tab: the image, served from the read cache."""
+    st.subheader("Screenshot")
+    if screenshot_path.exists():
+        screenshot_bytes = read_file_bytes(str(screenshot_path), screenshot_path.stat().st_mtime_ns)
+        st.image(screenshot_bytes, use_container_width=True)
+        st.caption(f"Saved to: {screenshot_path}")
+    else:
+        st.error(f"Screenshot file not found: {screenshot_path}")
+
+
+def render_html_tab(html_path: Path):
+    """HTML tab: a 5000 character preview plus a download of the whole file."""
+    st.subheader("HTML Content")
+    if html_path.exists():
+        # Only decode the part of the file that is shown
+        html_preview, truncated = read_text_preview(str(html_path), html_path.stat().st_mtime_ns, 5000)
+        st.code(html_preview, language="html")
+        if truncated:
+            st.info(f"Showing first 5000 characters. Total: {html_path.stat().st_size:,} bytes")
+        st.caption(f"Saved to: {html_path}")
+
+        # Download button (bytes are only read when clicked)
+        st.download_button(
+            label="Download HTML",
+            data=html_path.read_bytes,
+            file_name=html_path.name,
+            mime="text/html",
+            on_click="ignore"  # A rerun would clear the extraction results
+        )
+    else:
+        st.error(f"HTML file not found: {html_path}")
+
+
+def render_json_tab(title: str, data, file_name: str):
+    """Tab for one of the JSON outputs (structured data, images, ...)."""
+    st.subheader(title)
+    show_json_preview(data, file_name)
+
+
+def result_tabs(result) -> list:
+    """
+    Work out which output tabs an extraction result needs.
+
+    Returns:
+        List of (tab name, render callable) in display order, one per
+        output present in result
+    """
+    sections = []
+    if result.screenshot_path:
+        sections.append(("Screenshot", partial(render_screenshot_tab, result.screenshot_path)))
+    if result.html_path:
+        sections.append(("HTML", partial(render_html_tab, result.html_path)))
+    if result.structured_data:
+        sections.append(("Structured Data", partial(
+            render_json_tab, "Structured Data", result.structured_data, "structured_data.json")))
+    if result.images:
+        sections.append(("Images", partial(
+            render_json_tab, f"Images ({len(result.images)})", result.images, "images.json")))
+    if result.tables:
+        sections.append(("Tables", partial(
+            render_json_tab, f"Tables ({len(result.tables)})", result.tables, "tables.json")))
+    if result.forms:
+        sections.append(("Forms", partial(
+            render_json_tab, f"Forms ({len(result.forms)})", result.forms, "forms.json")))
+    if result.metadata:
+        sections.append(("Metadata", partial(
+            render_json_tab, "Metadata", result.metadata, "metadata.json")))
+    return sections
+
+
+# Fragments: their own widgets (video URL, theme, copy buttons) rerun only the
+# fragment, so the extraction results above stay on screen
+@st.fragment
+def render_funnel_section(result, url: str):
+    """Marketing Funnel QR builder for an extraction result."""
+    st.markdown("---")
+    st.subheader("📈 Create Marketing Funnel QR")
+
+    st.info("""
+    **Turn this page into a conversion machine!**  
+    Create a QR code that shows a video + your offer when scanned.
+    """)
+
+    # Extract available data
+    page_title, page_description, og_image, detected_video, detected_price = \
+        extract_funnel_fields(result.structured_data or {}, result.metadata or {})
+
+    # Show what we extracted - only if we found something useful
+    has_useful_data = any([page_title, page_description, og_image, detected_video, detected_price])
+
+    if has_useful_data:
+        with st.expander("📊 Extracted Data for Funnel", expanded=False):
+            if page_title:
+                st.write(f"**Page Title:** {page_title}")
+            if page_description:
+                desc_preview = page_description[:200] + '...' if len(page_description) > 200 else page_description
+                st.write(f"**Description:** {desc_preview}")
+            if og_image:
+                st.write(f"**OG Image:** Found ✅")
+            if detected_video:
+                st.write(f"**Video Detected:** {detected_video}")
+            if detected_price:
+                st.write(f"**Price Detected:** {detected_price}")
+
+            if not any([page_title, page_description]):
+                st.warning("⚠️ No meaningful content extracted. You'll need to provide headline and offer text manually in QR-Greeting.")
+    else:
+        st.warning("⚠️ No structured metadata found on this page. You'll need to provide all content manually in QR-Greeting.")
+
+    # Video URL input - simple approach without complex state management
+    funnel_col1, funnel_col2 = st.columns([3, 1])
+
+    with funnel_col1:
+        video_url_input = st.text_input(
+            "🎬 Video URL (optional but recommended)",
+            value=detected_video or "",
+            placeholder="https://youtube.com/watch?v=... or https://youtu.be/...",
+            help="Add a video to make your funnel more engaging",
+            key="funnel_video_url_input"  # Simple, fixed key
+        )
+
+    with funnel_col2:
+        st.write("")  # Spacing
+        st.write("")
+        # Show validation ONLY if input is not empty
+        if video_url_input and video_url_input.strip():
+            # Quick validation
+            video_url_lower = video_url_input.lower()
+            if 'youtube' in video_url_lower or 'youtu.be' in video_url_lower:
+                st.success("✅ YouTube")
+            elif 'vimeo' in video_url_lower:
+                st.success("✅ Vimeo")
+            elif video_url_input.endswith(('.mp4', '.webm')):
+                st.success("✅ Direct")
+            else:
+                st.warning("⚠️ Unknown")
+
+    # Build the funnel URL
+    funnel_redirect_url = build_funnel_url(
+        landing_url=url,  # The page they just scraped
+        video_url=video_url_input,
+        page_title=page_title,
+        page_description=page_description,
+        og_image=og_image,
+        detected_price=detected_price
+    )
+
+    # Action buttons
+    btn_col1, btn_col2 = st.columns(2)
+
+    with btn_col1:
+        st.link_button(
+            "📈 Create Marketing Funnel QR →",
+            url=funnel_redirect_url,
+            type="primary",
+            use_container_width=True
+        )
+
+    with btn_col2:
+        if st.button("📋 Copy Funnel Link", use_container_width=True, key="copy_funnel_link"):
+            st.code(funnel_redirect_url, language=None)
+
+    st.caption("💡 Opens QR-Greeting with your page data pre-filled. Add your offer details there.")
+
+
+@st.fragment
+def render_qr_greeting_section(result, url: str):
+    """Share-as-QR-Greeting section for an extraction result."""
+    st.markdown("---")
+    st.subheader("🎁 Share as QR Greeting")
+
+    # Extract content for QR
+    qr_title = ""
+    qr_summary = ""
+
+    if result.structured_data:
+        qr_title = result.structured_data.get('title', '')
+        paragraphs = result.structured_data.get('paragraphs', [])
+        if paragraphs and len(paragraphs) > 0:
+            qr_summary = paragraphs[0] if paragraphs[0] else ""
+
+    # Auto-detect theme with option to override
+    auto_theme = detect_theme_from_url(url)
+    theme_options = ["lights", "fireworks", "snowflake", "stars",
+                     "confetti", "champagne", "hearts"]
+
+    qr_col1, qr_col2 = st.columns([3, 1])
+
+    with qr_col1:
+        st.write("📤 Transform this page into a shareable QR greeting!")
+
+    with qr_col2:
+        selected_theme = st.selectbox(
+            "Theme",
+            options=theme_options,
+            index=theme_options.index(auto_theme) if auto_theme in theme_options else 0,
+            key="qr_theme_selector",
+            label_visibility="collapsed"
+        )
+
+    # Build QR-Greeting URL
+    qr_greeting_url = build_qr_greeting_url(
+        source_url=url,
+        title=qr_title,
+        summary=qr_summary,
+        theme=selected_theme
+    )
+
+    btn_col1, btn_col2 = st.columns(2)
+
+    with btn_col1:
+        st.link_button(
+            "🎁 Create QR Greeting →",
+            url=qr_greeting_url,
+            type="primary",
+            use_container_width=True
+        )
+
+    with btn_col2:
+        if st.button("📋 Copy Greeting Link",
+                     use_container_width=True,
+                     key="copy_qr_greeting_link"):
+            st.code(qr_greeting_url, language=None)
+
+    st.caption("💡 Opens QR-Greeting with pre-filled content from this page")
+    st.markdown("---")
+
 
 st.set_page_config(page_title="NetPull + Streamlit POC", layout="wide")
 
@@ -367,7 +1125,7 @@ if not NETPULL_AVAILABLE:
     st.code("pip install netpull", language="bash")
     st.stop()
 
-st.success("✅ netpull is installed and imported successfully")
+st.success("✅ netpull is installed")
 
 # Initialize browsers on first run (deferred from module import)
 if sys.platform == 'linux':
@@ -383,8 +1141,8 @@ if sys.platform == 'linux':
 # Sidebar configuration
 st.sidebar.header("Configuration")
 
-# Parse query parameters for defaults
-qp = st.query_params
+# Parse query parameters for defaults (snapshot once into a plain dict)
+qp = st.query_params.to_dict()
 default_browser = qp.get("browser", "firefox").lower()
 if default_browser not in ["firefox", "chrome", "webkit"]:
     default_browser = "firefox"
@@ -443,46 +1201,41 @@ st.sidebar.markdown("---")
 st.sidebar.subheader("🎯 Output Options")
 enable_funnel = st.sidebar.checkbox("📈 Marketing Funnel QR", value=False, help="Enable marketing funnel QR code generator after extraction")
 
-# Extract button
-manual_extract = st.button("Extract Content", type="primary")
+# Extract buttons
+extract_col, refresh_col = st.columns([1, 4])
+with extract_col:
+    manual_extract = st.button("Extract Content", type="primary")
+with refresh_col:
+    force_refresh = st.button("🔄 Re-extract", help="Skip the cached result and fetch the live page again")
 
-if manual_extract or should_auto_extract:
+if manual_extract or force_refresh or should_auto_extract:
     if should_auto_extract:
         st.session_state.auto_extracted = True
     if not url:
         st.warning("Please enter a URL")
     else:
-        # Create output directory
-        output_dir = Path("./poc_output")
-        output_dir.mkdir(exist_ok=True)
-
-        # Configure browser
-        browser_config = BrowserConfig(
-            browser_type=browser_type,
-            headless=headless,
-            timeout=timeout * 1000  # Convert to milliseconds
-        )
-
-        # Configure extraction
-        extraction_config = ExtractionConfig(
-            output_dir=output_dir,
-            extract_screenshot=extract_screenshot,
-            extract_html=extract_html,
-            extract_images=extract_images,
-            extract_tables=extract_tables,
-            extract_forms=extract_forms,
-            extract_metadata=extract_metadata
+        extract_args = (
+            url,
+            browser_type,
+            headless,
+            timeout * 1000,  # Convert to milliseconds
+            (extract_screenshot, extract_html, extract_images,
+             extract_tables, extract_forms, extract_metadata)
         )
 
         # Progress indicator
-        with st.spinner(f"Extracting content from {url}..."):
+        with st.spinner(f"Extracting content from {url}...", show_time=True):
             try:
-                # Extract webpage
-                result = extract_webpage(
-                    url=url,
-                    extraction_config=extraction_config,
-                    browser_config=browser_config
-                )
+                # Extract webpage (cached per URL + configuration)
+                if force_refresh:
+                    extract_cached.clear(*extract_args)
+                result = result_from_dict(extract_cached(*extract_args))
+                if any(path and not path.exists() for path in (result.screenshot_path, result.html_path)):
+                    # Cached result whose output files were removed; extract again
+                    extract_cached.clear(*extract_args)
+                    result = result_from_dict(extract_cached(*extract_args))
+                if not result.success:
+                    extract_cached.clear(*extract_args)  # Don't pin failures in the cache
 
                 # Display results
                 if result.success:
@@ -495,273 +1248,21 @@ if manual_extract or should_auto_extract:
                             trigger_download(result.html_path, result.html_path.name)
 
                     # Create tabs for different outputs
-                    tabs = []
-                    tab_names = []
-
-                    if result.screenshot_path:
-                        tab_names.append("Screenshot")
-                    if result.html_path:
-                        tab_names.append("HTML")
-                    if result.structured_data:
-                        tab_names.append("Structured Data")
-                    if result.images:
-                        tab_names.append("Images")
-                    if result.tables:
-                        tab_names.append("Tables")
-                    if result.forms:
-                        tab_names.append("Forms")
-                    if result.metadata:
-                        tab_names.append("Metadata")
-
-                    if tab_names:
-                        tabs = st.tabs(tab_names)
-                        tab_index = 0
-
-                        # Screenshot tab
-                        if result.screenshot_path:
-                            with tabs[tab_index]:
-                                st.subheader("Screenshot")
-                                if result.screenshot_path.exists():
-                                    st.image(str(result.screenshot_path), use_container_width=True)
-                                    st.caption(f"Saved to: {result.screenshot_path}")
-                                else:
-                                    st.error(f"Screenshot file not found: {result.screenshot_path}")
-                            tab_index += 1
-
-                        # HTML tab
-                        if result.html_path:
-                            with tabs[tab_index]:
-                                st.subheader("HTML Content")
-                                if result.html_path.exists():
-                                    with open(result.html_path, 'r', encoding='utf-8') as f:
-                                        html_content = f.read()
-                                    st.code(html_content[:5000], language="html")  # Show first 5000 chars
-                                    if len(html_content) > 5000:
-                                        st.info(f"Showing first 5000 characters. Total: {len(html_content)} characters")
-                                    st.caption(f"Saved to: {result.html_path}")
-
-                                    # Download button
-                                    st.download_button(
-                                        label="Download HTML",
-                                        data=html_content,
-                                        file_name=result.html_path.name,
-                                        mime="text/html"
-                                    )
-                                else:
-                                    st.error(f"HTML file not found: {result.html_path}")
-                            tab_index += 1
-
-                        # Structured data tab
-                        if result.structured_data:
-                            with tabs[tab_index]:
-                                st.subheader("Structured Data")
-                                st.json(result.structured_data)
-                            tab_index += 1
-
-                        # Images tab
-                        if result.images:
-                            with tabs[tab_index]:
-                                st.subheader(f"Images ({len(result.images)})")
-                                st.json(result.images)
-                            tab_index += 1
-
-                        # Tables tab
-                        if result.tables:
-                            with tabs[tab_index]:
-                                st.subheader(f"Tables ({len(result.tables)})")
-                                st.json(result.tables)
-                            tab_index += 1
-
-                        # Forms tab
-                        if result.forms:
-                            with tabs[tab_index]:
-                                st.subheader(f"Forms ({len(result.forms)})")
-                                st.json(result.forms)
-                            tab_index += 1
-
-                        # Metadata tab
-                        if result.metadata:
-                            with tabs[tab_index]:
-                                st.subheader("Metadata")
-                                st.json(result.metadata)
-                            tab_index += 1
-
-                    # =================================================
-                    # Marketing Funnel QR Builder Section (Optional)
-                    # =================================================
+                    sections = result_tabs(result)
+                    if sections:
+                        tabs = st.tabs([name for name, _ in sections])
+                        for tab, (_, render) in zip(tabs, sections):
+                            with tab:
+                                render()
+
                     if enable_funnel:
-                        st.markdown("---")
-                        st.subheader("📈 Create Marketing Funnel QR")
-                        
-                        st.info("""
-                        **Turn this page into a conversion machine!**  
-                        Create a QR code that shows a video + your offer when scanned.
-                        """)
-                        
-                        # Extract available data
-                        page_title = ""
-                        page_description = ""
-                        og_image = ""
-                        detected_video = ""
-                        detected_price = ""
-                        
-                        if result.structured_data:
-                            page_title = result.structured_data.get('title', '')
-                        
-                        if result.metadata:
-                            page_description = result.metadata.get('og:description', '') or \
-                                              result.metadata.get('description', '')
-                            og_image = result.metadata.get('og:image', '')
-                            detected_video = extract_video_from_page(
-                                result.structured_data or {}, 
-                                result.metadata or {}
-                            )
-                            detected_price = extract_price_from_page(
-                                result.structured_data or {},
-                                result.metadata or {}
-                            )
-                        
-                        # Show what we extracted - only if we found something useful
-                        has_useful_data = any([page_title, page_description, og_image, detected_video, detected_price])
-                        
-                        if has_useful_data:
-                            with st.expander("📊 Extracted Data for Funnel", expanded=False):
-                                if page_title:
-                                    st.write(f"**Page Title:** {page_title}")
-                                if page_description:
-                                    desc_preview = page_description[:200] + '...' if len(page_description) > 200 else page_description
-                                    st.write(f"**Description:** {desc_preview}")
-                                if og_image:
-                                    st.write(f"**OG Image:** Found ✅")
-                                if detected_video:
-                                    st.write(f"**Video Detected:** {detected_video}")
-                                if detected_price:
-                                    st.write(f"**Price Detected:** {detected_price}")
-                                
-                                if not any([page_title, page_description]):
-                                    st.warning("⚠️ No meaningful content extracted. You'll need to provide headline and offer text manually in QR-Greeting.")
-                        else:
-                            st.warning("⚠️ No structured metadata found on this page. You'll need to provide all content manually in QR-Greeting.")
-                        
-                        # Video URL input - simple approach without complex state management
-                        funnel_col1, funnel_col2 = st.columns([3, 1])
-                        
-                        with funnel_col1:
-                            video_url_input = st.text_input(
-                                "🎬 Video URL (optional but recommended)",
-                                value=detected_video or "",
-                                placeholder="https://youtube.com/watch?v=... or https://youtu.be/...",
-                                help="Add a video to make your funnel more engaging",
-                                key="funnel_video_url_input"  # Simple, fixed key
-                            )
-                        
-                        with funnel_col2:
-                            st.write("")  # Spacing
-                            st.write("")
-                            # Show validation ONLY if input is not empty
-                            if video_url_input and video_url_input.strip():
-                                # Quick validation
-                                if 'youtube' in video_url_input.lower() or 'youtu.be' in video_url_input.lower():
-                                    st.success("✅ YouTube")
-                                elif 'vimeo' in video_url_input.lower():
-                                    st.success("✅ Vimeo")
-                                elif video_url_input.endswith(('.mp4', '.webm')):
-                                    st.success("✅ Direct")
-                                else:
-                                    st.warning("⚠️ Unknown")
-                        
-                        # Build the funnel URL
-                        funnel_redirect_url = build_funnel_url(
-                            landing_url=url,  # The page they just scraped
-                            video_url=video_url_input,
-                            page_title=page_title,
-                            page_description=page_description,
-                            og_image=og_image,
-                            detected_price=detected_price
-                        )
-                        
-                        # Action buttons
-                        btn_col1, btn_col2 = st.columns(2)
-                        
-                        with btn_col1:
-                            st.link_button(
-                                "📈 Create Marketing Funnel QR →",
-                                url=funnel_redirect_url,
-                                type="primary",
-                                use_container_width=True
-                            )
-                        
-                        with btn_col2:
-                            if st.button("📋 Copy Funnel Link", use_container_width=True, key="copy_funnel_link"):
-                                st.code(funnel_redirect_url, language=None)
-                        
-                        st.caption("💡 Opens QR-Greeting with your page data pre-filled. Add your offer details there.")
-
-                    # =================================================
-                    # QR-Greeting Integration Section
-                    # =================================================
-                    st.markdown("---")
-                    st.subheader("🎁 Share as QR Greeting")
-
-                    # Extract content for QR
-                    qr_title = ""
-                    qr_summary = ""
-
-                    if result.structured_data:
-                        qr_title = result.structured_data.get('title', '')
-                        paragraphs = result.structured_data.get('paragraphs', [])
-                        if paragraphs and len(paragraphs) > 0:
-                            qr_summary = paragraphs[0] if paragraphs[0] else ""
-
-                    # Auto-detect theme with option to override
-                    auto_theme = detect_theme_from_url(url)
-                    theme_options = ["lights", "fireworks", "snowflake", "stars",
-                                     "confetti", "champagne", "hearts"]
-
-                    qr_col1, qr_col2 = st.columns([3, 1])
-
-                    with qr_col1:
-                        st.write("📤 Transform this page into a shareable QR greeting!")
-
-                    with qr_col2:
-                        selected_theme = st.selectbox(
-                            "Theme",
-                            options=theme_options,
-                            index=theme_options.index(auto_theme) if auto_theme in theme_options else 0,
-                            key="qr_theme_selector",
-                            label_visibility="collapsed"
-                        )
-
-                    # Build QR-Greeting URL
-                    qr_greeting_url = build_qr_greeting_url(
-                        source_url=url,
-                        title=qr_title,
-                        summary=qr_summary,
-                        theme=selected_theme
-                    )
-
-                    btn_col1, btn_col2 = st.columns(2)
-
-                    with btn_col1:
-                        st.link_button(
-                            "🎁 Create QR Greeting →",
-                            url=qr_greeting_url,
-                            type="primary",
-                            use_container_width=True
-                        )
-
-                    with btn_col2:
-                        if st.button("📋 Copy Greeting Link",
-                                     use_container_width=True,
-                                     key="copy_qr_greeting_link"):
-                            st.code(qr_greeting_url, language=None)
-
-                    st.caption("💡 Opens QR-Greeting with pre-filled content from this page")
-                    st.markdown("---")
+                        render_funnel_section(result, url)
+
+                    render_qr_greeting_section(result, url)
 
                     # Result summary
                     with st.expander("View Full Result Object"):
-                        st.json(result.to_dict())
+                        show_json_preview(result.to_dict(), "result.json")
 
                 else:
                     st.error(f"❌ Extraction failed: {result.error}")
@@ -775,14 +1276,13 @@ with st.expander("System Information"):
     st.write("**Python Version:**", sys.version)
     st.write("**Streamlit Version:**", st.__version__)
 
-    if NETPULL_AVAILABLE:
-        import netpull
-        st.write("**NetPull Version:**", netpull.__version__)
+    versions = package_versions()
+    if versions["netpull"]:
+        st.write("**NetPull Version:**", versions["netpull"])
 
-    try:
-        import playwright
-        st.write("**Playwright Available:**", "✅ Yes")
-    except ImportError:
+    if versions["playwright"]:
+        st.write("**Playwright Available:**", f"✅ Yes ({versions['playwright']})")
+    else:
         st.write("**Playwright Available:**", "❌ No")
 
 # Instructions
@@ -1,52 +1,119 @@
 """
 Script to install Playwright browsers on Streamlit Cloud
 This runs before the main app to ensure browsers are available
+
+app.py imports install_playwright_browsers() from here for its first-run install.
 """
+import os
+import signal
 import subprocess
 import sys
-import os
+import tempfile
+
+# Bytes of installer output kept for the failure message
+INSTALL_ERROR_TAIL = 4096
+
 
-def install_playwright_browsers():
-    """Install Playwright browsers if not already installed"""
-    print("Checking Playwright browser installation...")
+def _playwright_cli():
+    """
+    Command prefix and environment for Playwright's CLI.
 
+    `python -m playwright` only starts a second interpreter to exec the
+    bundled Node driver, so run the driver directly when it can be located.
+
+    Returns:
+        (argv prefix list, env dict or None for the inherited environment)
+    """
     try:
-        # Install both Firefox and Chromium
-        print("Installing Firefox and Chromium...")
-        result = subprocess.run(
-            [sys.executable, "-m", "playwright", "install", "firefox", "chromium"],
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 minute timeout
-        )
+        from playwright._impl._driver import compute_driver_executable, get_driver_env
+        driver = compute_driver_executable()
+        argv = [str(part) for part in driver] if isinstance(driver, tuple) else [str(driver)]
+        return argv, get_driver_env()
+    except Exception:
+        # Private API; fall back to the public entry point if it moves
+        return [sys.executable, "-m", "playwright"], None
+
+
+def _run_playwright_install(browser: str, timeout: int, capture: bool = True):
+    """
+    Run `playwright install <browser>` and wait for it.
 
-        if result.returncode == 0:
-            print("✅ Playwright browsers installed successfully")
-            print(result.stdout)
-        else:
-            print(f"⚠️ Warning: Browser installation returned code {result.returncode}")
-            print(result.stderr)
-            
-            # Fallback: try just firefox
-            print("Attempting fallback: installing only Firefox...")
-            fallback = subprocess.run(
-                [sys.executable, "-m", "playwright", "install", "firefox"],
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
-            
-            if fallback.returncode == 0:
-                print("✅ Playwright Firefox installed successfully (fallback)")
+    Args:
+        browser: Browser name to install
+        timeout: Seconds before the install is killed
+        capture: Collect the output instead of letting it go to this
+            process's stdout/stderr
+
+    Returns:
+        (returncode, output bytes); output is the last INSTALL_ERROR_TAIL
+        bytes of stdout+stderr when captured (otherwise only a timeout note).
+        An install that hit the timeout is killed and reports a non-zero
+        returncode
+    """
+    cli, env = _playwright_cli()
+
+    # Captured output goes to an unnamed temp file rather than a pipe, so
+    # memory stays flat however much the installer writes; only the tail is
+    # read. The CLI reports some errors on stdout, so both streams are kept
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen(
+            [*cli, "install", browser],
+            stdout=log if capture else None,
+            stderr=subprocess.STDOUT if capture else None,
+            env=env,
+            start_new_session=True
+        )
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            if hasattr(os, "killpg"):
+                # Kill the whole group so the driver's children go too
+                os.killpg(proc.pid, signal.SIGKILL)
             else:
-                print(f"❌ Fallback failed: {fallback.stderr}")
+                proc.kill()
+            proc.wait()
+            log.write(f"\nTimed out after {timeout}s".encode())
+        log.seek(max(0, log.seek(0, os.SEEK_END) - INSTALL_ERROR_TAIL))
+        return proc.returncode, log.read()
+
+
+def install_playwright_browsers(browsers=("firefox", "chromium"), timeout: int = 600,
+                                required=("firefox",), capture: bool = True):
+    """
+    Install Playwright browsers one after the other.
+
+    `playwright install` holds an exclusive lock on the browser cache for
+    the whole install, so separate processes can't download in parallel;
+    one process per browser still gives each its own timeout and result.
+
+    Args:
+        browsers: Browser names to pass to `playwright install`, in order
+        timeout: Seconds each install may take before it is killed
+        required: Browsers the app can't run without; if one fails, the
+            rest are not attempted
+        capture: Keep installer output out of the console and print only its
+            tail on failure; False streams it straight through (script use)
+
+    Returns:
+        List of the browsers that failed to install (empty on success)
+    """
+    failed = []
+    for browser in browsers:
+        print(f"Installing Playwright {browser}...")
+        returncode, output = _run_playwright_install(browser, timeout, capture)
+        if returncode == 0:
+            print(f"✅ Playwright {browser} installed successfully")
+            continue
+        detail = output.decode('utf-8', errors='replace').strip()
+        print(f"❌ {browser} installation failed" + (f": {detail}" if detail else f" (exit code {returncode})"))
+        failed.append(browser)
+        if browser in required:
+            break
+    return failed
 
-    except subprocess.TimeoutExpired:
-        print("❌ Browser installation timed out")
-        sys.exit(1)
-    except Exception as e:
-        print(f"❌ Error installing browsers: {e}")
-        sys.exit(1)
 
 if __name__ == "__main__":
-    install_playwright_browsers()
+    # Firefox (the app's default) is required; Chromium only adds the Chrome option
+    # Run as the deploy script, installer output streams to the deploy log
+    failed = install_playwright_browsers(capture=False)
+    sys.exit(1 if "firefox" in failed else 0)